@@ -1,22 +1,21 @@
 #!/usr/bin/env python3
-import argparse, pathlib, logging, os, sys, json
+import argparse, pathlib, logging, os, re, sys, json, threading, hashlib, asyncio
+from functools import lru_cache
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 load_dotenv()
-from src.llm_client import call_llm_resume_json
-from src.validators import normalize_email, normalize_phone, normalize_skills, to_int, is_valid_email
-from src.airtable_client import upsert_record, record_exists
+from src.llm_client import call_llm_resume_json_batch
+from src.validators import normalize_email, normalize_phone, normalize_skills, normalize_records, to_int, is_valid_email
 
-# date parsing
-try:
-    from dateutil.parser import parse as dateparse
-except Exception:
-    dateparse = None
-    from datetime import datetime
+# date parsing (dateutil is optional and imported on first use)
+from datetime import date, datetime
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger("import_resumes")
 
 SUPPORTED_SUFFIXES = {".pdf", ".docx", ".txt"}
+_ISO_DATE_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})$")
 
 # Fixed fields we will send to Airtable (no linked-record fields or lookups from Jobs)
 FIXED_FIELDS = [
@@ -25,12 +24,20 @@ FIXED_FIELDS = [
     "Current Location", "Status", "Candidate Status", "Job Role",
 ]
 
+# recruiter-owned workflow fields (and the LLM client's "New"/"CV Upload" defaults): written
+# only when the upsert creates the record, so re-imports never overwrite them
+CREATE_ONLY_FIELDS = ("Source", "Status", "Candidate Status")
+
 def iter_resume_files(path: str):
     p = pathlib.Path(path)
     if not p.exists():
         raise FileNotFoundError(f"Path not found: {path}")
     if p.is_dir():
-        return sorted([f for f in p.iterdir() if f.suffix.lower() in SUPPORTED_SUFFIXES])
+        # scandir's DirEntry carries the file type from the directory listing, so no stat per entry
+        with os.scandir(p) as it:
+            names = [e.name for e in it
+                     if e.is_file() and pathlib.PurePath(e.name).suffix.lower() in SUPPORTED_SUFFIXES]
+        return sorted(p / n for n in names)
     if p.suffix.lower() not in SUPPORTED_SUFFIXES:
         raise ValueError(f"Unsupported file type: {p.suffix}")
     return [p]
@@ -39,16 +46,17 @@ def read_text(path: str) -> str:
     try:
         p = str(path).lower()
         if p.endswith(".pdf"):
-            from pypdf import PdfReader
-            return "\n".join((pg.extract_text() or "") for pg in PdfReader(path).pages)
+            from src.extract_resume import read_pdf_text
+            return read_pdf_text(str(path))
         if p.endswith(".docx"):
             from docx import Document
-            doc = Document(path)
+            with open(path, "rb") as fh:
+                doc = Document(fh)
             return "\n".join(p.text for p in doc.paragraphs)
     except Exception as e:
         logger.warning("Failed specialized extraction for %s: %s", path, e)
-    with open(path, "r", encoding="utf-8", errors="ignore") as fh:
-        return fh.read()
+    from src.extract_resume import read_plain_text
+    return read_plain_text(str(path))
 
 def _parse_date_to_iso(val):
     """Return ISO date string 'YYYY-MM-DD' or empty string if invalid/missing."""
@@ -57,6 +65,21 @@ def _parse_date_to_iso(val):
     s = str(val).strip()
     if not s:
         return ""
+    return _parse_date_str(s)
+
+@lru_cache(maxsize=4096)
+def _parse_date_str(s: str) -> str:
+    # fast path: already ISO, no need for dateutil's fuzzy parser
+    m = _ISO_DATE_RE.match(s)
+    if m:
+        try:
+            return date(int(m[1]), int(m[2]), int(m[3])).isoformat()
+        except ValueError:
+            return ""
+    try:
+        from dateutil.parser import parse as dateparse
+    except Exception:
+        dateparse = None
     # try dateutil if available
     try:
         if dateparse:
@@ -74,8 +97,13 @@ def _parse_date_to_iso(val):
         return ""
     return ""
 
-def coerce_fields(parsed: dict):
-    """Normalize and coerce values for Airtable insertion."""
+def coerce_fields(parsed: dict, normalized: bool = False):
+    """
+    Normalize and coerce values for Airtable insertion. This is the only normalization pass;
+    the LLM client hands back values as the model produced them. Pass normalized=True when
+    Email/Phone/Skills already went through validators.normalize_records.
+    Fields that end up None or "" are left out, so an upsert never blanks an existing value.
+    """
     payload = {}
 
     # Allowed options for single-select fields in Airtable (must match Airtable exactly)
@@ -99,15 +127,15 @@ def coerce_fields(parsed: dict):
 
         # Email
         elif field == "Email":
-            value = normalize_email(value) if value else ""
+            value = (value or "") if normalized else normalize_email(value)
 
         # Phone
         elif field == "Phone":
-            value = normalize_phone(value) if value else ""
+            value = (value or "") if normalized else normalize_phone(value)
 
         # Skills
         elif field == "Skills":
-            value = normalize_skills(value) if value else ""
+            value = (value or "") if normalized else normalize_skills(value)
 
         # Resume URL -> empty string if None (Airtable URL accepts "" or valid URL)
         elif field == "ResumeURL":
@@ -118,36 +146,152 @@ def coerce_fields(parsed: dict):
 
         # Single-select fields -> only allowed options
         elif field == "Source":
-            val = (value or "").strip()
+            val = str(value or "").strip()
             value = val if val in ALLOWED_SOURCES else None
 
         elif field == "Status":
-            val = (value or "").strip()
+            val = str(value or "").strip()
             value = val if val in ALLOWED_STATUS else None
 
         elif field == "Candidate Status":
-            val = (value or "").strip()
+            val = str(value or "").strip()
             value = val if val in ALLOWED_CANDIDATE_STATUS else None
 
         # Date fields -> ISO date OR None (do NOT send empty string)
         #elif field in ("CV Sent Date", "Offer Date", "Joining Date"):
             #iso = _parse_date_to_iso(value)
             #value = iso if iso else None
-        # Default: empty string if None (safe for text fields)
+        # Default: stripped text, empty string if None (safe for text fields)
         else:
-            value = value or ""
+            value = value.strip() if isinstance(value, str) else (value or "")
 
+        if value is None or value == "":
+            continue
         payload[field] = value
 
     return payload
 
 
+def _read_one(f) -> str:
+    logger.info("Reading: %s", f)
+    txt = read_text(str(f))
+    if not txt.strip():
+        txt = f"File: {f.name}\n[No text extracted]"
+    return txt
+
+
+def _parse_chunk(chunk, batch_size: int):
+    """LLM-parse a chunk of (key, text) pairs. Returns (key, parsed, error) triples in order."""
+    logger.info("Parsing batch of %d resume(s)", len(chunk))
+    try:
+        parsed_list = call_llm_resume_json_batch([t for _, t in chunk], batch_size=batch_size,
+                                                 return_errors=True)
+    except Exception as e:
+        logger.exception("LLM batch failed for %d file(s): %s", len(chunk), e)
+        return [(k, None, str(e)) for k, _ in chunk]
+    # a resume the model could not parse fails on its own; the rest of the chunk goes on
+    return [(k, None, str(parsed)) if isinstance(parsed, Exception) else (k, parsed, None)
+            for (k, _), parsed in zip(chunk, parsed_list)]
+
+
+def _process_one(f, parsed: dict, dry_run: bool, seen_keys: set, keys_lock) -> dict:
+    """
+    Coerce and dedupe one parsed resume (already through normalize_records).
+    Returns its `details` entry; new records are "pending".
+    """
+    fpath = str(f)
+    logger.info("Processing: %s", fpath)
+    try:
+        payload = coerce_fields(parsed, normalized=True)
+
+        # dedupe key: email if valid, else candidate name; Airtable merges on the matching field
+        email = payload.get("Email")
+        if is_valid_email(email):
+            key_field, dedupe_key = "Email", email
+        else:
+            key_field, dedupe_key = "Candidate Name", payload.get("Candidate Name") or f.name
+            payload["Candidate Name"] = dedupe_key
+
+        # the server dedupes against existing records; this only catches repeats within the run
+        with keys_lock:
+            seen = (key_field, dedupe_key) in seen_keys
+            seen_keys.add((key_field, dedupe_key))
+
+        if seen:
+            logger.info("Key already imported in this run, skipping: %s", dedupe_key)
+            return {"file": fpath, "status": "skipped_exists", "key": dedupe_key}
+
+        create_only = {k: payload.pop(k) for k in CREATE_ONLY_FIELDS if k in payload}
+
+        if dry_run:
+            logger.info("[DRY RUN] Would upsert: key=%s payload=%s create_only=%s", dedupe_key,
+                        json.dumps(payload, indent=2), json.dumps(create_only))
+            return {"file": fpath, "status": "dry_run", "key": dedupe_key, "payload": payload,
+                    "create_only": create_only}
+
+        # written later in bulk by main
+        return {"file": fpath, "status": "pending", "key": dedupe_key, "key_field": key_field,
+                "payload": payload, "create_only": create_only}
+
+    except Exception as e:
+        logger.exception("Error processing %s: %s", fpath, e)
+        return {"file": fpath, "status": "error", "error": str(e)}
+
+
+async def _upsert_pending(table: str, pending: dict) -> None:
+    """
+    Write all pending records concurrently (one request set per merge field, all chunks in
+    flight on one event loop) and update each `details` entry with the outcome. Existing
+    records only get the merged payload; CREATE_ONLY_FIELDS are then PATCHed onto the
+    records this run created, and an entry whose PATCH fails gets a "warning".
+    """
+    # imported here so dry runs (and runs with nothing to write) never load httpx
+    from src.airtable_async import make_client, upsert_records_bulk_async, update_records_bulk_async
+
+    async def one(key_field, to_upsert):
+        logger.info("Upserting %d record(s) in %s on %s", len(to_upsert), table, key_field)
+        try:
+            return await upsert_records_bulk_async(client, table, [d["payload"] for d in to_upsert],
+                                                   key_field=key_field)
+        except Exception as e:
+            logger.exception("Bulk upsert failed: %s", e)
+            return [{"error": str(e)}] * len(to_upsert)
+
+    async with make_client() as client:
+        results = await asyncio.gather(*(one(k, v) for k, v in pending.items()))
+
+        updates, created_by_id = [], {}
+        for to_upsert, recs in zip(pending.values(), results):
+            for d, rec in zip(to_upsert, recs):
+                del d["payload"]
+                create_only = d.pop("create_only")
+                if rec.get("error"):
+                    d.update(status="error", error=rec["error"])
+                    continue
+                created = rec.get("created", True)
+                d.update(status="inserted" if created else "updated", id=rec.get("id"))
+                logger.info("Upserted %s -> id=%s", d["key"], d["id"])
+                if created and create_only and rec.get("id"):
+                    updates.append({"id": rec["id"], "fields": create_only})
+                    created_by_id[rec["id"]] = d
+
+        if updates:
+            for u in await update_records_bulk_async(client, table, updates):
+                if u.get("error"):
+                    logger.error("Could not set %s on new record %s: %s",
+                                 ", ".join(u["fields"]), u["id"], u["error"])
+                    created_by_id[u["id"]]["warning"] = f"{', '.join(u['fields'])} not set: {u['error']}"
+
+
 def main(argv=None):
     ap = argparse.ArgumentParser(description="Import resumes into Airtable (fixed schema).")
     ap.add_argument("path", help="File or directory containing resumes")
     ap.add_argument("--table", default=os.getenv("AIRTABLE_TABLE_NAME", "Candidates"),
                     help="Airtable table name")
     ap.add_argument("--dry-run", action="store_true", help="Don't upsert; just print payloads")
+    ap.add_argument("--batch-size", type=int, default=int(os.getenv("LLM_BATCH_SIZE", "8")),
+                    help="Resumes sent to the LLM per request (capped so the reply fits "
+                         "OPENAI_MAX_OUTPUT_TOKENS, default 16384)")
     args = ap.parse_args(argv)
 
     try:
@@ -156,60 +300,79 @@ def main(argv=None):
         logger.error("Error enumerating files: %s", e)
         sys.exit(1)
 
-    inserted = skipped_exists = skipped_invalid = errors = 0
-    details = []
-
-    for f in files:
-        fpath = str(f)
-        logger.info("Processing: %s", fpath)
-        try:
-            txt = read_text(fpath)
-            if not txt.strip():
-                txt = f"File: {f.name}\n[No text extracted]"
+    batch_size = max(1, args.batch_size)
+    workers = max(1, int(os.getenv("IMPORT_WORKERS", "8")))
+    by_file = {}
 
-            parsed = call_llm_resume_json(txt)
-            payload = coerce_fields(parsed)
-
-            # dedupe key: email if valid, else candidate name
-            email = payload.get("Email")
-            name = payload.get("Candidate Name") or f.name
-            dedupe_key = email if is_valid_email(email) else name
+    seen_keys = set()
+    keys_lock = threading.Lock()
 
+    # every stage is network/IO bound, so one thread pool is shared across them
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        # read everything first so the LLM can be fed several resumes per request
+        texts = []
+        for f, fut in [(f, ex.submit(_read_one, f)) for f in files]:
             try:
-                exists = record_exists(args.table, "Email", dedupe_key)
+                texts.append((f, fut.result()))
             except Exception as e:
-                logger.warning("Existence check failed for %s: %s — proceeding", dedupe_key, e)
-                exists = False
-
-            if exists:
-                logger.info("Record already exists, skipping: %s", dedupe_key)
-                skipped_exists += 1
-                details.append({"file": fpath, "status": "skipped_exists", "key": dedupe_key})
-                continue
-
-            if args.dry_run:
-                logger.info("[DRY RUN] Would upsert: key=%s payload=%s", dedupe_key, json.dumps(payload, indent=2))
-                details.append({"file": fpath, "status": "dry_run", "key": dedupe_key, "payload": payload})
-                continue
-
-            rec = upsert_record(args.table, "Email", dedupe_key, payload)
-            rec_id = rec.get("id")
-            logger.info("Upserted %s -> id=%s", dedupe_key, rec_id)
-            inserted += 1
-            details.append({"file": fpath, "status": "inserted", "key": dedupe_key, "id": rec_id})
-
-        except Exception as e:
-            logger.exception("Error processing %s: %s", fpath, e)
-            errors += 1
-            details.append({"file": fpath, "status": "error", "error": str(e)})
+                logger.exception("Error reading %s: %s", f, e)
+                by_file[str(f)] = {"file": str(f), "status": "error", "error": str(e)}
+
+        # identical texts (re-submissions, format variants) go to the LLM once and share the result
+        files_by_hash = defaultdict(list)
+        unique = []
+        for f, txt in texts:
+            h = hashlib.sha1(txt.encode("utf-8")).hexdigest()
+            if h not in files_by_hash:
+                unique.append((h, txt))
+            files_by_hash[h].append(f)
+        if len(unique) < len(texts):
+            logger.info("%d file(s) share text with another file; parsing %d unique resume(s)",
+                        len(texts) - len(unique), len(unique))
+
+        chunks = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+        todo = []
+        for results in ex.map(lambda c: _parse_chunk(c, batch_size), chunks):
+            for h, parsed, err in results:
+                for f in files_by_hash[h]:
+                    if err is None:
+                        todo.append((f, parsed))
+                    else:
+                        by_file[str(f)] = {"file": str(f), "status": "error", "error": err}
+
+        # contact fields for the whole run in one pass
+        rows = normalize_records([parsed for _, parsed in todo])
+        todo = [(f, row) for (f, _), row in zip(todo, rows)]
+
+        for d in ex.map(lambda item: _process_one(item[0], item[1], args.dry_run, seen_keys, keys_lock), todo):
+            by_file[d["file"]] = d
+
+    # batch the writes: 10 server-side upserts per Airtable request, one request set per merge field
+    pending = defaultdict(list)
+    for d in by_file.values():
+        if d["status"] == "pending":
+            pending[d.pop("key_field")].append(d)
+    if pending:
+        asyncio.run(_upsert_pending(args.table, pending))
+
+    details = [by_file[str(f)] for f in files]
+    counts = Counter(d["status"] for d in details)
+    inserted = counts["inserted"]
+    updated = counts["updated"]
+    skipped_exists = counts["skipped_exists"]
+    skipped_invalid = counts["skipped_invalid"]
+    errors = counts["error"]
+    warnings = sum(1 for d in details if d.get("warning"))
 
     # Summary
     print("\n===== Import Summary =====")
     print(f"Total files processed : {len(files)}")
     print(f"Inserted             : {inserted}")
-    print(f"Skipped (exists)     : {skipped_exists}")
+    print(f"Updated (exists)     : {updated}")
+    print(f"Skipped (duplicate)  : {skipped_exists}")
     print(f"Skipped (invalid)    : {skipped_invalid}")
     print(f"Errors               : {errors}")
+    print(f"Warnings             : {warnings}")
     print("==========================\n")
 
     for d in details:
@@ -217,15 +380,21 @@ def main(argv=None):
         fp = d.get("file")
         if s == "inserted":
             print(f"[INSERTED] {fp} -> {d.get('key')} (id={d.get('id')})")
+            if d.get("warning"):
+                print(f"  [WARNING] {d['warning']}")
+        elif s == "updated":
+            print(f"[UPDATED] {fp} -> {d.get('key')} (id={d.get('id')})")
         elif s == "skipped_exists":
-            print(f"[SKIP:EXISTS] {fp} -> {d.get('key')}")
+            print(f"[SKIP:DUPLICATE] {fp} -> {d.get('key')}")
         elif s == "dry_run":
             print(f"[DRY RUN] {fp} -> {d.get('key')}")
             print(json.dumps(d.get("payload", {}), indent=2))
+            if d.get("create_only"):
+                print(f"  new records only: {json.dumps(d['create_only'])}")
         else:
             print(f"[ERROR] {fp} -> {d.get('error')}")
 
-    sys.exit(0 if errors == 0 else 2)
+    sys.exit(0 if errors == 0 and warnings == 0 else 2)
 
 if __name__ == "__main__":
     main()
@@ -3,35 +3,65 @@
 Package initializer for resume parsing project.
 Allows imports like:
     from src import extract_one, call_llm_resume_json
+
+Only the validators are imported eagerly; the extraction, LLM and Airtable helpers
+(and the PDF/DOCX/OpenAI/requests stacks behind them) load on first attribute access.
 """
 
-from .extract_resume import extract_one, process_path
-from .llm_client import call_llm_resume_json
+import importlib
+
 from .validators import (
     normalize_email,
     normalize_phone,
     normalize_skills,
+    normalize_records,
     to_int,
     is_valid_email,
 )
 
-# Optional: Airtable upsert (mock-safe if not configured)
-try:
-    from .airtable_client import upsert_record, record_exists, find_record_by_name
-except Exception:
-    upsert_record = None
-    record_exists = None
-    find_record_by_name = None
+_LAZY = {
+    "extract_one": ".extract_resume",
+    "process_path": ".extract_resume",
+    "call_llm_resume_json": ".llm_client",
+    "call_llm_resume_json_batch": ".llm_client",
+    "upsert_record": ".airtable_client",
+    "record_exists": ".airtable_client",
+    "find_record_by_name": ".airtable_client",
+    "upsert_records_bulk": ".airtable_client",
+    "upsert_records_bulk_async": ".airtable_async",
+}
+
+# Optional: Airtable upsert (mock-safe if not configured) -> None if the client can't load
+_OPTIONAL = {".airtable_client", ".airtable_async"}
+
+
+def __getattr__(name):
+    modname = _LAZY.get(name)
+    if modname is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        value = getattr(importlib.import_module(modname, __name__), name)
+    except Exception:
+        if modname not in _OPTIONAL:
+            raise
+        value = None
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     "extract_one",
     "process_path",
     "call_llm_resume_json",
+    "call_llm_resume_json_batch",
     "normalize_email",
     "normalize_phone",
     "normalize_skills",
+    "normalize_records",
     "to_int",
     "is_valid_email",
     "upsert_record",
     "record_exists",
+    "upsert_records_bulk",
+    "upsert_records_bulk_async",
 ]
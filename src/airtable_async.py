@@ -0,0 +1,165 @@
+# src/airtable_async.py
+"""
+Async Airtable helpers on httpx.AsyncClient (HTTP/2 when `h2` is installed).
+
+Configuration, retry policy, payloads and response handling come from src/airtable_client.py;
+only the transport differs. One event loop overlaps all request waits; an asyncio.Semaphore(5)
+plus a 5 req/s token bucket keep the fan-out inside Airtable's per-base rate limit.
+
+    async with make_client() as client:
+        recs = await upsert_records_bulk_async(client, "Candidates", rows)
+"""
+import os
+import time
+import json
+import asyncio
+import logging
+import weakref
+from typing import List, Dict, Any
+
+import httpx
+
+from . import airtable_client as ac
+from .airtable_client import HEADERS, loads
+
+logger = logging.getLogger(__name__)
+
+_RATE = float(os.getenv("AIRTABLE_RATE_LIMIT", "5"))
+
+
+class _AsyncRateLimiter:
+    """Token bucket for one event loop; same debt model as airtable_client._RateLimiter."""
+
+    def __init__(self, rate: float):
+        self._rate = float(rate)
+        self._tokens = float(rate)
+        self._last = time.monotonic()
+
+    async def acquire(self) -> None:
+        # no await between reading and updating the bucket, so no lock is needed
+        now = time.monotonic()
+        self._tokens = min(self._rate, self._tokens + (now - self._last) * self._rate)
+        self._last = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self._rate)
+
+
+# asyncio primitives belong to one event loop, so each loop gets its own pair
+_LOOP_LIMITS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+
+def _limits():
+    loop = asyncio.get_running_loop()
+    if loop not in _LOOP_LIMITS:
+        _LOOP_LIMITS[loop] = (asyncio.Semaphore(5), _AsyncRateLimiter(_RATE))
+    return _LOOP_LIMITS[loop]
+
+
+def make_client() -> httpx.AsyncClient:
+    try:
+        import h2  # noqa: F401  (httpx needs it for http2=True)
+        http2 = True
+    except ImportError:
+        http2 = False
+    return httpx.AsyncClient(http2=http2, headers=HEADERS, timeout=30)
+
+
+async def _request(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> httpx.Response:
+    """Rate-limited request, retried like airtable_client._request."""
+    sem, limiter = _limits()
+    attempt = 0
+    while True:
+        async with sem:
+            await limiter.acquire()
+            r = await client.request(method, url, **kwargs)
+        if not ac.should_retry(method, r.status_code, attempt):
+            return r
+        delay = ac.retry_delay(attempt, r.headers)
+        logger.warning("Airtable returned %s; retrying in %.1fs", r.status_code, delay)
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def record_exists_async(client: httpx.AsyncClient, table: str, key_field: str, key_value: str) -> bool:
+    if not ac.AIRTABLE_CONFIGURED:
+        return False
+    try:
+        r = await _request(client, "GET", ac.table_url(table), params=ac.exists_params(key_field, key_value))
+    except httpx.HTTPError as ex:
+        logger.exception("Network error calling Airtable record_exists: %s", ex)
+        return False
+
+    if r.status_code in (401, 403):
+        logger.error("Airtable unauthorized for record_exists (status=%s). Check AIRTABLE_TOKEN permissions.", r.status_code)
+        return False
+
+    if r.is_error:
+        logger.error("Airtable record_exists HTTP error: %s", r.text[:500])
+        return False
+
+    return bool(loads(r.content).get("records", []))
+
+
+async def _upsert_chunk(client: httpx.AsyncClient, url: str, chunk: List[Dict[str, Any]],
+                        payload: Dict[str, Any], key_field: str) -> List[Dict[str, Any]]:
+    try:
+        r = await _request(client, "PATCH", url, json=payload)
+        if r.status_code in (401, 403):
+            logger.error("Airtable upsert unauthorized (status=%s). Returning mock records. Check AIRTABLE_TOKEN.", r.status_code)
+            return [ac.mock_record(row, key_field) for row in chunk]
+        if r.status_code == 422:
+            logger.error("Airtable returned 422 Unprocessable Entity. Response: %s", r.text[:2000])
+            logger.error("Payload that caused 422: %s", json.dumps(payload, indent=2))
+        r.raise_for_status()
+    except httpx.HTTPError as ex:
+        logger.exception("Error upserting %d Airtable record(s): %s", len(chunk), ex)
+        return ac.failed_records(chunk, str(ex))
+    return ac.upsert_results(loads(r.content), chunk)
+
+
+async def upsert_records_bulk_async(client: httpx.AsyncClient, table: str, rows: List[Dict[str, Any]],
+                                    key_field: str = "Email") -> List[Dict[str, Any]]:
+    """
+    Async upsert_records_bulk: all 10-record performUpsert chunks are in flight together
+    (bounded by the semaphore and rate limiter). Returns one record per row, in order.
+    """
+    if not ac.AIRTABLE_CONFIGURED:
+        logger.info("Airtable not configured, returning %d mock record(s) for table=%s", len(rows), table)
+        return [ac.mock_record(row, key_field) for row in rows]
+
+    url = ac.table_url(table)
+    results = await asyncio.gather(*(_upsert_chunk(client, url, chunk, payload, key_field)
+                                     for chunk, payload in ac.upsert_chunks(rows, key_field)))
+    return [rec for chunk in results for rec in chunk]
+
+
+async def upsert_record_async(client: httpx.AsyncClient, table: str, key_field: str, key_value: str,
+                              fields: dict) -> Dict[str, Any]:
+    """Async upsert_record: one performUpsert PATCH merging on `key_field`."""
+    rec = (await upsert_records_bulk_async(client, table, [{**fields, key_field: key_value}], key_field))[0]
+    if rec.get("error"):
+        raise RuntimeError(rec["error"])
+    return rec
+
+
+async def _update_chunk(client: httpx.AsyncClient, url: str, chunk: List[Dict[str, Any]],
+                        payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    try:
+        r = await _request(client, "PATCH", url, json=payload)
+        r.raise_for_status()
+    except httpx.HTTPError as ex:
+        logger.exception("Error updating %d Airtable record(s): %s", len(chunk), ex)
+        return [{**u, "error": str(ex)} for u in chunk]
+    return loads(r.content).get("records", [])
+
+
+async def update_records_bulk_async(client: httpx.AsyncClient, table: str,
+                                    updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Async update_records_bulk: PATCH {"id", "fields"} updates, all chunks in flight together."""
+    if not ac.AIRTABLE_CONFIGURED:
+        return [dict(u) for u in updates]
+    url = ac.table_url(table)
+    results = await asyncio.gather(*(_update_chunk(client, url, chunk, payload)
+                                     for chunk, payload in ac.update_chunks(updates)))
+    return [rec for chunk in results for rec in chunk]
@@ -3,13 +3,28 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
+import time
+import threading
 import requests
 import urllib.parse
 import logging
 import json
-from typing import List, Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+from functools import lru_cache
 from pathlib import Path
 
+# orjson is optional: C-speed parsing for API responses and the field cache when installed.
+# `loads` and the retry / payload helpers below are shared with src/airtable_async.py.
+try:
+    import orjson
+    loads = orjson.loads
+    _dumps = lambda o: orjson.dumps(o, option=orjson.OPT_INDENT_2).decode("utf-8")
+except ImportError:
+    loads = json.loads
+    _dumps = lambda o: json.dumps(o, indent=2)
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
@@ -20,15 +35,135 @@ HEADERS = {"Content-Type": "application/json"}
 if TOKEN:
     HEADERS["Authorization"] = f"Bearer {TOKEN}"
 
-_AIRTABLE_CONFIGURED = bool(TOKEN and BASE)
-if not _AIRTABLE_CONFIGURED:
+AIRTABLE_CONFIGURED = bool(TOKEN and BASE)
+if not AIRTABLE_CONFIGURED:
     logger.warning("Airtable not configured (AIRTABLE_TOKEN/AIRTABLE_BASE_ID missing). Using mock mode.")
 
 
+
+class _RateLimiter:
+    """Token bucket shared by all threads: at most `rate` requests per second, bursts up to `rate`."""
+
+    def __init__(self, rate: float):
+        self._rate = float(rate)
+        self._tokens = float(rate)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._rate, self._tokens + (now - self._last) * self._rate)
+            self._last = now
+            # take a token even if the bucket is empty; the debt is how long this caller waits
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+# Airtable allows 5 requests/second per base; one keep-alive session avoids a TLS handshake per call
+_LIMITER = _RateLimiter(float(os.getenv("AIRTABLE_RATE_LIMIT", "5")))
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=8,
+    # connection errors only; status retries happen in _request so every attempt takes a token
+    max_retries=Retry(total=5, backoff_factor=0.5, status_forcelist=(),
+                      allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"PATCH"},
+                      raise_on_status=False),
+))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+UPSERT_CHUNK = 10  # Airtable's per-request record limit
+
+
+def should_retry(method: str, status_code: int, attempt: int) -> bool:
+    # POST creates are not idempotent; GETs and performUpsert PATCHes (merge on a key) are
+    return status_code in RETRY_STATUSES and method != "POST" and attempt < MAX_RETRIES
+
+
+def retry_delay(attempt: int, headers) -> float:
+    """Seconds to wait before retry `attempt` (0-based): Retry-After if given, else backoff."""
+    try:
+        return float(headers.get("Retry-After", ""))
+    except ValueError:
+        return 0.5 * (2 ** attempt)
+
+
+def _request(method: str, url: str, **kwargs) -> requests.Response:
+    """Rate-limited request; retries 429/5xx up to 5 times, each attempt through the limiter."""
+    kwargs.setdefault("timeout", 30)
+    attempt = 0
+    while True:
+        _LIMITER.acquire()
+        r = SESSION.request(method, url, **kwargs)
+        if not should_retry(method, r.status_code, attempt):
+            return r
+        delay = retry_delay(attempt, r.headers)
+        logger.warning("Airtable returned %s; retrying in %.1fs", r.status_code, delay)
+        time.sleep(delay)
+        attempt += 1
+
+
 def _quote_table(table: str) -> str:
     return urllib.parse.quote(table, safe="")
 
 
+def table_url(table: str) -> str:
+    return f"{API_BASE}/{BASE}/{_quote_table(table)}"
+
+
+def exists_params(key_field: str, key_value: str) -> Dict[str, Any]:
+    """Query params matching at most one record whose `key_field` equals `key_value`."""
+    safe_val = str(key_value).replace("'", "\\'")
+    return {"filterByFormula": f"{{{key_field}}}='{safe_val}'", "maxRecords": 1}
+
+
+def mock_record(row: Dict[str, Any], key_field: str) -> Dict[str, Any]:
+    return {"id": f"mock-{str(row.get(key_field, '')).replace(' ', '_')}", "fields": row, "created": True}
+
+
+def upsert_chunks(rows: List[Dict[str, Any]], key_field: str) -> Iterator[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+    """Split `rows` into Airtable-sized batches, yielding (chunk, performUpsert payload)."""
+    for start in range(0, len(rows), UPSERT_CHUNK):
+        chunk = rows[start:start + UPSERT_CHUNK]
+        yield chunk, {
+            "performUpsert": {"fieldsToMergeOn": [key_field]},
+            "records": [{"fields": row} for row in chunk],
+        }
+
+
+def update_chunks(updates: List[Dict[str, Any]]) -> Iterator[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+    """Split {"id", "fields"} updates into Airtable-sized batches, yielding (chunk, PATCH payload)."""
+    for start in range(0, len(updates), UPSERT_CHUNK):
+        chunk = updates[start:start + UPSERT_CHUNK]
+        yield chunk, {"records": [{"id": u["id"], "fields": u["fields"]} for u in chunk]}
+
+
+def failed_records(chunk: List[Dict[str, Any]], error: str) -> List[Dict[str, Any]]:
+    return [{"id": None, "fields": row, "error": error} for row in chunk]
+
+
+def upsert_results(body: Dict[str, Any], chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    One record per row of `chunk` from a performUpsert response, each with "created" set;
+    rows the response is missing come back as failed records.
+    """
+    records = body.get("records", [])
+    created_ids = set(body.get("createdRecords", []))
+    if len(records) != len(chunk):
+        logger.warning("Airtable returned %d record(s) for a batch of %d", len(records), len(chunk))
+    out = []
+    for rec in records[:len(chunk)]:
+        rec["created"] = rec.get("id") in created_ids
+        out.append(rec)
+    out.extend(failed_records(chunk[len(records):], "missing from Airtable response"))
+    return out
+
+
 def _cache_dir() -> Path:
     d = Path(".cache")
     d.mkdir(parents=True, exist_ok=True)
@@ -39,7 +174,7 @@ def _cache_get(key: str) -> Optional[Dict[str, Any]]:
     p = _cache_dir() / f"{key}.json"
     if p.exists():
         try:
-            return json.loads(p.read_text(encoding="utf-8"))
+            return loads(p.read_bytes())
         except Exception:
             return None
     return None
@@ -47,65 +182,85 @@ def _cache_get(key: str) -> Optional[Dict[str, Any]]:
 
 def _cache_set(key: str, value: Dict[str, Any]) -> None:
     p = _cache_dir() / f"{key}.json"
-    p.write_text(json.dumps(value, indent=2), encoding="utf-8")
+    p.write_text(_dumps(value), encoding="utf-8")
 
 
-def get_table_fields(table: str, use_cache: bool = True, force_refresh: bool = False) -> List[str]:
-    """
-    Return a list of Airtable field names for `table`. Uses a lightweight GET (maxRecords=1).
-    Caches result to .cache/airtable_fields_{base}_{table}.json
-    """
+class _FieldsUnavailable(Exception):
+    """Field discovery failed (network/auth/HTTP); raised so the failure is not memoized."""
+
+
+def _fetch_table_fields(table: str, use_cache: bool) -> Tuple[str, ...]:
     key = f"airtable_fields_{BASE}_{table}"
-    if use_cache and not force_refresh:
+    if use_cache:
         cached = _cache_get(key)
         if cached and isinstance(cached, dict) and "fields" in cached:
-            return cached["fields"]
+            return tuple(cached["fields"])
 
-    if not _AIRTABLE_CONFIGURED:
+    if not AIRTABLE_CONFIGURED:
         # nothing to query, return empty list
         logger.info("Airtable not configured; returning empty field list for %s", table)
-        return []
+        return ()
 
-    url = f"{API_BASE}/{BASE}/{_quote_table(table)}"
+    url = table_url(table)
     try:
-        r = requests.get(url, headers=HEADERS, params={"maxRecords": 1}, timeout=30)
+        r = _request("GET", url, params={"maxRecords": 1})
     except requests.RequestException as ex:
         logger.exception("Network error calling Airtable to fetch fields: %s", ex)
-        return []
+        raise _FieldsUnavailable() from ex
 
     if r.status_code in (401, 403):
         logger.error("Airtable unauthorized when fetching fields (status=%s). Check AIRTABLE_TOKEN.", r.status_code)
-        return []
+        raise _FieldsUnavailable()
 
     try:
         r.raise_for_status()
-    except requests.HTTPError:
+    except requests.HTTPError as ex:
         logger.exception("Airtable returned error when fetching fields: %s", r.text[:1000])
-        return []
+        raise _FieldsUnavailable() from ex
 
-    records = r.json().get("records", [])
+    records = loads(r.content).get("records", [])
     if not records:
         # no records yet; we cannot infer fields from a record, but try the keys of first record fallback
         logger.info("No records in table %s; returning empty fields list", table)
         _cache_set(key, {"fields": []})
-        return []
+        return ()
 
     # get keys from the `fields` object of the first record
     first = records[0].get("fields", {})
     field_names = list(first.keys())
     _cache_set(key, {"fields": field_names})
     logger.info("Discovered %d fields for table %s (cached)", len(field_names), table)
-    return field_names
+    return tuple(field_names)
+
+
+@lru_cache(maxsize=32)
+def _memo_table_fields(base: Optional[str], table: str) -> Tuple[str, ...]:
+    # `base` is only part of the key; lru_cache does not store calls that raise
+    return _fetch_table_fields(table, use_cache=True)
+
+
+def get_table_fields(table: str, use_cache: bool = True, force_refresh: bool = False) -> Tuple[str, ...]:
+    """
+    Return a tuple of Airtable field names for `table`. Uses a lightweight GET (maxRecords=1).
+    Caches result to .cache/airtable_fields_{base}_{table}.json and memoizes it in-process,
+    so repeated calls in one run cost nothing. Failed lookups return () and are not memoized.
+    """
+    try:
+        if use_cache and not force_refresh:
+            return _memo_table_fields(BASE, table)
+        fields = _fetch_table_fields(table, use_cache=False)
+        # later cached calls should see what was just fetched
+        _memo_table_fields.cache_clear()
+        return fields
+    except _FieldsUnavailable:
+        return ()
 
 
 def record_exists(table: str, key_field: str, key_value: str) -> bool:
-    if not _AIRTABLE_CONFIGURED:
+    if not AIRTABLE_CONFIGURED:
         return False
-    safe_val = str(key_value).replace("'", "\\'")
-    formula = f"{{{key_field}}}='{safe_val}'"
-    url = f"{API_BASE}/{BASE}/{_quote_table(table)}"
     try:
-        r = requests.get(url, headers=HEADERS, params={"filterByFormula": formula, "maxRecords": 1}, timeout=30)
+        r = _request("GET", table_url(table), params=exists_params(key_field, key_value))
     except requests.RequestException as ex:
         logger.exception("Network error calling Airtable record_exists: %s", ex)
         return False
@@ -120,7 +275,7 @@ def record_exists(table: str, key_field: str, key_value: str) -> bool:
         logger.exception("Airtable record_exists HTTP error: %s", r.text[:500])
         return False
 
-    records = r.json().get("records", [])
+    records = loads(r.content).get("records", [])
     return bool(records)
 
 def find_record_by_name(table_name: str, name: str):
@@ -128,7 +283,6 @@ def find_record_by_name(table_name: str, name: str):
     Find a record in Airtable by its Name field.
     Returns the record dict (with 'id') or None if not found.
     """
-    from requests import get
     import os
 
     base_id = os.getenv("AIRTABLE_BASE_ID")
@@ -136,45 +290,36 @@ def find_record_by_name(table_name: str, name: str):
     url = f"https://api.airtable.com/v0/{base_id}/{table_name}?filterByFormula=NAME()='{name}'"
 
     headers = {"Authorization": f"Bearer {api_key}"}
-    resp = get(url, headers=headers)
+    resp = _request("GET", url, headers=headers)
     resp.raise_for_status()
-    records = resp.json().get("records", [])
+    records = loads(resp.content).get("records", [])
     return records[0] if records else None
 
 
 def upsert_record(table: str, key_field: str, key_value: str, fields: dict) -> Dict[str, Any]:
     """
-    Upsert record. If Airtable not configured -> return mock record.
+    Upsert record in one request: Airtable's performUpsert merges on `key_field`, updating the
+    matching record or creating a new one. The returned record carries "created": True/False.
+    If Airtable not configured -> return mock record.
     If unauthorized while trying to create/update -> return mock record.
     """
-    if not _AIRTABLE_CONFIGURED:
-        mock_id = f"mock-{str(key_value).replace(' ', '_')}"
-        logger.info("Airtable not configured, returning mock record id=%s for table=%s", mock_id, table)
-        return {"id": mock_id, "fields": fields}
-
-    try:
-        exists = record_exists(table, key_field, key_value)
-    except Exception as ex:
-        logger.warning("Error when checking for existing record: %s. Proceeding to create.", ex)
-        exists = False
-
-    if exists:
-        mock_id = f"exists-{str(key_value).replace(' ', '_')}"
-        logger.info("Record exists, skipping creation: %s=%s", key_field, key_value)
-        return {"id": mock_id, "fields": fields}
-
-    url = f"{API_BASE}/{BASE}/{_quote_table(table)}"
-    payload = {"fields": fields}
+    row = {**fields, key_field: key_value}
+    if not AIRTABLE_CONFIGURED:
+        rec = mock_record(row, key_field)
+        logger.info("Airtable not configured, returning mock record id=%s for table=%s", rec["id"], table)
+        return rec
+
+    url = table_url(table)
+    (chunk, payload), = upsert_chunks([row], key_field)
     try:
-        r = requests.post(url, headers=HEADERS, json=payload, timeout=30)
+        r = _request("PATCH", url, json=payload)
     except requests.RequestException as ex:
-        logger.exception("Network error creating Airtable record: %s", ex)
+        logger.exception("Network error upserting Airtable record: %s", ex)
         raise
 
     if r.status_code in (401, 403):
-        logger.error("Airtable create unauthorized (status=%s). Returning mock record. Check AIRTABLE_TOKEN.", r.status_code)
-        mock_id = f"mock-{str(key_value).replace(' ', '_')}"
-        return {"id": mock_id, "fields": fields}
+        logger.error("Airtable upsert unauthorized (status=%s). Returning mock record. Check AIRTABLE_TOKEN.", r.status_code)
+        return mock_record(row, key_field)
 
     if r.status_code == 422:
         # helpful debug details: include Airtable response and payload in logs
@@ -184,4 +329,64 @@ def upsert_record(table: str, key_field: str, key_value: str, fields: dict) -> D
         r.raise_for_status()
 
     r.raise_for_status()
-    return r.json()
+    rec = upsert_results(loads(r.content), chunk)[0]
+    if rec.get("error"):
+        raise RuntimeError(rec["error"])
+    return rec
+
+
+def upsert_records_bulk(table: str, rows: List[Dict[str, Any]], key_field: str = "Email") -> List[Dict[str, Any]]:
+    """
+    Upsert `rows` (each a fields dict that includes `key_field`) with Airtable's performUpsert,
+    10 records per PATCH. Returns one record dict per row, in order, each with "created":
+    True for new records and False for records that matched on `key_field` and were updated.
+    Rows from a chunk that failed come back as {"id": None, "fields": row, "error": "..."}
+    so callers can report them individually.
+    If Airtable is not configured or the write is unauthorized -> mock records.
+    """
+    if not AIRTABLE_CONFIGURED:
+        logger.info("Airtable not configured, returning %d mock record(s) for table=%s", len(rows), table)
+        return [mock_record(row, key_field) for row in rows]
+
+    url = table_url(table)
+    out: List[Dict[str, Any]] = []
+    for chunk, payload in upsert_chunks(rows, key_field):
+        try:
+            r = _request("PATCH", url, json=payload)
+            if r.status_code in (401, 403):
+                logger.error("Airtable upsert unauthorized (status=%s). Returning mock records. Check AIRTABLE_TOKEN.", r.status_code)
+                out.extend(mock_record(row, key_field) for row in chunk)
+                continue
+            if r.status_code == 422:
+                logger.error("Airtable returned 422 Unprocessable Entity. Response: %s", r.text[:2000])
+                logger.error("Payload that caused 422: %s", json.dumps(payload, indent=2))
+            r.raise_for_status()
+        except requests.RequestException as ex:
+            logger.exception("Error upserting %d Airtable record(s): %s", len(chunk), ex)
+            out.extend(failed_records(chunk, str(ex)))
+            continue
+        out.extend(upsert_results(loads(r.content), chunk))
+    return out
+
+
+def update_records_bulk(table: str, updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    PATCH `updates` ({"id": record_id, "fields": {...}}) onto existing records, 10 per request.
+    Only the given fields change. Returns the updated records in order; updates from a failed
+    chunk come back with an "error". If Airtable is not configured -> the updates as given.
+    """
+    if not AIRTABLE_CONFIGURED:
+        return [dict(u) for u in updates]
+
+    url = table_url(table)
+    out: List[Dict[str, Any]] = []
+    for chunk, payload in update_chunks(updates):
+        try:
+            r = _request("PATCH", url, json=payload)
+            r.raise_for_status()
+        except requests.RequestException as ex:
+            logger.exception("Error updating %d Airtable record(s): %s", len(chunk), ex)
+            out.extend({**u, "error": str(ex)} for u in chunk)
+            continue
+        out.extend(loads(r.content).get("records", []))
+    return out
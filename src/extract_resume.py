@@ -1,21 +1,91 @@
-import os, sys, pathlib
-from docx import Document
-from pypdf import PdfReader
-from .llm_client import call_llm_resume_json
+import os, sys, pathlib, threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from .llm_client import call_llm_resume_json, MAX_RESUME_CHARS
 from .airtable_client import upsert_record, record_exists
 from .validators import is_valid_email, normalize_email, normalize_phone, normalize_skills, to_int
 
+PARALLEL_MIN_PAGES = 4
+# plain-text reads stop here; the LLM only ever sees the first MAX_RESUME_CHARS anyway
+MAX_TEXT_CHARS = 2 * 1024 * 1024
+
+# one pool for the whole process, created on first use. read_pdf_text runs on the importer's
+# reader threads, and forking a threaded process can deadlock the child, so workers are spawned
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    global _page_pool
+    if _page_pool is None:
+        with _page_pool_lock:
+            if _page_pool is None:
+                _page_pool = ProcessPoolExecutor(max_workers=4, mp_context=multiprocessing.get_context("spawn"))
+    return _page_pool
+
+
+def _extract_page(args) -> str:
+    # runs in a worker process; each worker opens its own reader
+    from pypdf import PdfReader
+    path, i = args
+    with open(path, "rb") as fh:
+        return PdfReader(fh, strict=False).pages[i].extract_text() or ""
+
+
+def read_pdf_text(path: str) -> str:
+    """
+    Extract PDF text page by page, stopping once MAX_RESUME_CHARS have been collected since
+    the LLM prompt is truncated there anyway. With PDF_PARALLEL_PAGES set, documents of
+    PARALLEL_MIN_PAGES pages or more are extracted by a shared pool of 4 spawned worker
+    processes, one window of pages at a time.
+    """
+    from pypdf import PdfReader
+    out, total = [], 0
+    # own the file handle so it is closed as soon as the text is out
+    with open(path, "rb") as fh:
+        reader = PdfReader(fh, strict=False)
+        n = len(reader.pages)
+        if not (os.getenv("PDF_PARALLEL_PAGES") and n >= PARALLEL_MIN_PAGES):
+            for pg in reader.pages:
+                t = pg.extract_text() or ""
+                out.append(t)
+                total += len(t) + 1
+                # total counts a joining newline after every page; the last one never materialises
+                if total - 1 >= MAX_RESUME_CHARS:
+                    break
+            return "\n".join(out)
+
+    workers = min(4, n)
+    ex = _get_page_pool()
+    for start in range(0, n, workers):
+        window = [(path, i) for i in range(start, min(start + workers, n))]
+        for t in ex.map(_extract_page, window):
+            out.append(t)
+            total += len(t) + 1
+        if total - 1 >= MAX_RESUME_CHARS:
+            break
+    return "\n".join(out)
+
+
+def read_plain_text(path: str) -> str:
+    """Read a text file as UTF-8 (errors ignored), never more than MAX_TEXT_CHARS of it."""
+    # text mode keeps universal newlines and never cuts a multibyte character at the cap
+    with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+        return fh.read(MAX_TEXT_CHARS)
+
+
 def read_text(path: str) -> str:
     p = path.lower()
     if p.endswith(".pdf"):
         try:
-            return "\n".join((pg.extract_text() or "") for pg in PdfReader(path).pages)
+            return read_pdf_text(path)
         except: return ""
     if p.endswith(".docx"):
-        doc = Document(path)
+        from docx import Document
+        with open(path, "rb") as fh:
+            doc = Document(fh)
         return "\n".join(p.text for p in doc.paragraphs)
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        return f.read()
+    return read_plain_text(path)
 
 def extract_one(file_path: str) -> dict:
     txt = read_text(file_path)
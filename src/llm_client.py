@@ -2,30 +2,82 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
+import sys
 import json
 import re
+import time
+import hashlib
 import logging
-from typing import Dict, Any
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 
+# orjson is optional: C-speed parsing for model replies and the LLM cache when installed
 try:
-    from openai import OpenAI
-except Exception as e:
-    raise RuntimeError("OpenAI SDK import failed. Ensure 'openai' package (v1+) is installed.") from e
-
-from .validators import normalize_email, normalize_phone, normalize_skills, to_int
+    import orjson
+    _loads = orjson.loads
+    _dumps = lambda o: orjson.dumps(o, option=orjson.OPT_INDENT_2).decode("utf-8")
+except ImportError:
+    _loads = json.loads
+    _dumps = lambda o: json.dumps(o, indent=2)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger("src.llm_client")
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY not found in environment (.env)")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# the OpenAI SDK (httpx, pydantic, ...) is slow to import, so it is only loaded on the first call
+client = None
+_client_lock = threading.Lock()
+
+def _make_http_client():
+    """Keep-alive connection pool shared by all worker threads; HTTP/2 when `h2` is installed."""
+    try:
+        import httpx
+    except ImportError:
+        return None
+    try:
+        import h2  # noqa: F401  (httpx needs it for http2=True)
+        http2 = True
+    except ImportError:
+        http2 = False
+    return httpx.Client(
+        http2=http2,
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+        timeout=httpx.Timeout(60.0, connect=5.0),
+    )
+
+def _get_client():
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                try:
+                    from openai import OpenAI
+                except Exception as e:
+                    raise RuntimeError("OpenAI SDK import failed. Ensure 'openai' package (v1+) is installed.") from e
+                if not OPENAI_API_KEY:
+                    raise RuntimeError("OPENAI_API_KEY not found in environment (.env)")
+                # retries stay with tenacity on _call_openai_chat, so the SDK must not retry too
+                client = OpenAI(api_key=OPENAI_API_KEY, http_client=_make_http_client(), max_retries=0)
+    return client
+
+LLM_CACHE_DIR = Path(".cache") / "llm"
+# characters of each resume that reach the prompt; text past this is never seen by the model
+MAX_RESUME_CHARS = 16000
+# reply budget per resume in a batch, and the model's output cap (gpt-4o-mini: 16384);
+# OPENAI_MAX_OUTPUT_TOKENS overrides the cap for other models
+TOKENS_PER_RESUME = 1000
+DEFAULT_MAX_OUTPUT_TOKENS = 16384
+_JSON_DECODER = json.JSONDecoder()
+# leading ```json / ``` fence or trailing ``` fence, stripped in one pass
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
 
 JSON_PROMPT_TMPL = """You are a strict resume parser. Respond with JSON ONLY (no prose).
-Return a single JSON object with keys exactly:
+Return a single JSON object of the form {{"resumes": [{{...}}, {{...}}]}} with exactly one object
+per resume below, in the same order as the numbered "=== RESUME i ===" separators.
+Each object must have keys exactly:
 Candidate Name, Email, Phone, Skills, Exp Years, Source, ResumeURL, Salary, Notice Period, Current Location, Status, Job Role
 
 Rules:
@@ -40,35 +92,59 @@ Rules:
 - Status: "New" by default
 - Job Role: extract if mentioned
 - Do not return extra keys
+- Never merge two resumes into one object or skip a resume
 
-Resume text:
-{resume}
+{resumes}
 """
 
+def _max_output_tokens() -> int:
+    return int(os.getenv("OPENAI_MAX_OUTPUT_TOKENS", DEFAULT_MAX_OUTPUT_TOKENS))
+
+def _llm_cache_key(resume_text: str, model: str) -> str:
+    # the model is part of the key so switching OPENAI_MODEL does not serve stale parses
+    return hashlib.sha256(f"{model}\0{resume_text[:MAX_RESUME_CHARS]}".encode("utf-8")).hexdigest()
+
+def _llm_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    if os.getenv("LLM_CACHE_DISABLED"):
+        return None
+    p = LLM_CACHE_DIR / f"{key}.json"
+    try:
+        ttl = os.getenv("LLM_CACHE_TTL")
+        if ttl and time.time() - p.stat().st_mtime > float(ttl):
+            return None
+        return _loads(p.read_bytes())
+    except (OSError, ValueError):
+        return None
+
+def _llm_cache_set(key: str, value: Dict[str, Any]) -> None:
+    if os.getenv("LLM_CACHE_DISABLED"):
+        return
+    p = LLM_CACHE_DIR / f"{key}.json"
+    # write to a private temp file then rename, so concurrent readers never see a partial file
+    tmp = p.with_name(f"{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        LLM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(_dumps(value), encoding="utf-8")
+        os.replace(tmp, p)
+    except (OSError, TypeError, ValueError) as ex:
+        # a value orjson/json cannot serialize is as skippable as a full disk
+        logger.warning("Could not write LLM cache entry %s: %s", key, ex)
+
 def _clean_model_output(raw: str) -> str:
-    if not raw:
-        return ""
-    s = raw.strip()
-    s = re.sub(r"^```(?:json)?\s*", "", s, flags=re.IGNORECASE)
-    s = re.sub(r"\s*```$", "", s, flags=re.IGNORECASE)
-    return s.strip()
+    return _FENCE_RE.sub("", raw.strip()).strip() if raw else ""
 
 def _extract_json(text: str) -> Dict[str, Any]:
     start = text.find("{")
     if start == -1:
         raise ValueError("No JSON object found in model response")
-    sub = text[start:]
-    depth = 0
-    for i, ch in enumerate(sub):
-        if ch == "{": depth += 1
-        elif ch == "}": depth -= 1
-        if depth == 0:
-            candidate = sub[:i+1]
-            try:
-                return json.loads(candidate)
-            except json.JSONDecodeError:
-                pass
-    return json.loads(text)
+    # with response_format=json_object the reply is normally exactly one object
+    try:
+        return _loads(text[start:] if start else text)
+    except ValueError:
+        pass
+    # raw_decode is string-aware and stops at the end of the first object, ignoring trailing prose
+    obj, _ = _JSON_DECODER.raw_decode(text, start)
+    return obj
 
 def _ensure_keys(parsed: Dict[str, Any]) -> Dict[str, Any]:
     keys = ["Candidate Name", "Email", "Phone", "Skills", "Exp Years", "Source", "ResumeURL",
@@ -78,18 +154,37 @@ def _ensure_keys(parsed: Dict[str, Any]) -> Dict[str, Any]:
             parsed[k] = "" if k != "Exp Years" else 0
     return parsed
 
+def _apply_defaults(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    # field-level normalization (email/phone/skills/ints) happens once, in the caller's coercion step
+    parsed = _ensure_keys(parsed)
+    if not parsed.get("Source"):
+        parsed["Source"] = "CV Upload"
+    if not parsed.get("Status"):
+        parsed["Status"] = "New"
+    return parsed
+
+def _is_transient(ex: BaseException) -> bool:
+    # only rate limits, 5xx and network failures are worth another attempt; a bad request, a bad
+    # key or a missing SDK fails fast. openai is imported lazily, so if it is not loaded yet the
+    # error cannot be one of its own
+    openai = sys.modules.get("openai")
+    return openai is not None and isinstance(
+        ex, (openai.APIConnectionError, openai.APITimeoutError, openai.RateLimitError,
+             openai.InternalServerError))
+
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8),
-       retry=retry_if_exception_type(Exception))
-def _call_openai_chat(prompt: str, model: str = "gpt-4o-mini") -> str:
+       retry=retry_if_exception(_is_transient))
+def _call_openai_chat(prompt: str, model: str = "gpt-4o-mini", max_tokens: int = 1000) -> str:
     logger.info("Calling OpenAI model %s (prompt len=%d)", model, len(prompt))
-    response = client.chat.completions.create(
+    response = _get_client().chat.completions.create(
         model=model,
         messages=[
             {"role": "system", "content": "You are a helpful assistant that extracts structured JSON from resumes."},
             {"role": "user", "content": prompt}
         ],
-        max_tokens=1000,
+        max_tokens=max_tokens,
         temperature=0.0,
+        response_format={"type": "json_object"},
     )
     try:
         choice = response.choices[0]
@@ -98,27 +193,87 @@ def _call_openai_chat(prompt: str, model: str = "gpt-4o-mini") -> str:
     except Exception:
         raise ValueError(f"Failed to extract assistant content; raw response: {str(response)[:1000]}")
 
+def _parse_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    """One chat completion for all `texts`; returns parsed dicts in input order."""
+    blocks = "\n\n".join(f"=== RESUME {i} ===\n{t[:MAX_RESUME_CHARS]}" for i, t in enumerate(texts, 1))
+    prompt = JSON_PROMPT_TMPL.format(resumes=blocks)
+    raw = _call_openai_chat(prompt, model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+                            max_tokens=min(TOKENS_PER_RESUME * len(texts), _max_output_tokens()))
+    cleaned = _clean_model_output(raw)
+    data = _extract_json(cleaned)
+
+    if isinstance(data, dict) and isinstance(data.get("resumes"), list):
+        items = data["resumes"]
+    elif isinstance(data, list):
+        items = data
+    elif isinstance(data, dict) and len(texts) == 1:
+        # model ignored the wrapper and returned the lone object directly
+        items = [data]
+    else:
+        raise ValueError("Model response has no 'resumes' array")
+
+    # a merged, skipped or malformed entry makes positional alignment unsafe
+    if len(items) != len(texts) or not all(isinstance(item, dict) for item in items):
+        raise ValueError(f"Model returned {len(items)} resume(s) for a batch of {len(texts)}")
+    return [_apply_defaults(item) for item in items]
+
+def _parse_each(texts: List[str]) -> List[Any]:
+    """_parse_batch one text at a time; a text that fails holds its exception instead of a dict."""
+    out = []
+    for t in texts:
+        try:
+            out.append(_parse_batch([t])[0])
+        except Exception as ex:
+            logger.warning("Could not parse resume on its own: %s", ex)
+            out.append(ex)
+    return out
+
+def call_llm_resume_json_batch(texts: List[str], batch_size: int = 8,
+                               return_errors: bool = False) -> List[Any]:
+    """
+    Parse many resumes with one OpenAI request per `batch_size` texts.
+    Returns one dict per input text, aligned positionally with `texts`. Every schema key is
+    present, but values are as the model returned them; normalize with the validators.
+    Results are cached on disk by content hash (.cache/llm/{sha256}.json); only misses reach the model.
+    A batch whose reply cannot be parsed or aligned is re-sent one resume at a time. With
+    `return_errors` a resume that still fails holds its exception in the result list; otherwise
+    the first such exception is raised once every other resume has been parsed and cached.
+    """
+    if not all(isinstance(t, str) for t in texts):
+        raise ValueError("texts must be a list of strings")
+    # larger batches could not fit their replies under the model's output cap
+    batch_size = max(1, min(int(batch_size), _max_output_tokens() // TOKENS_PER_RESUME))
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+    keys = [_llm_cache_key(t, model) for t in texts]
+    results: List[Optional[Dict[str, Any]]] = [_llm_cache_get(k) for k in keys]
+    misses = [i for i, r in enumerate(results) if r is None]
+    if len(misses) < len(texts):
+        logger.info("LLM cache hit for %d of %d resume(s)", len(texts) - len(misses), len(texts))
+
+    for start in range(0, len(misses), batch_size):
+        idx = misses[start:start + batch_size]
+        batch = [texts[i] for i in idx]
+        try:
+            parsed_list = _parse_batch(batch)
+        except ValueError as ex:
+            if len(batch) == 1:
+                parsed_list = [ex]
+            else:
+                logger.warning("%s; parsing the %d resume(s) individually", ex, len(batch))
+                parsed_list = _parse_each(batch)
+        for i, parsed in zip(idx, parsed_list):
+            if not isinstance(parsed, Exception):
+                _llm_cache_set(keys[i], parsed)
+            results[i] = parsed
+
+    if not return_errors:
+        for r in results:
+            if isinstance(r, Exception):
+                raise r
+    return results
+
 def call_llm_resume_json(resume_text: str) -> Dict[str, Any]:
     if not isinstance(resume_text, str):
         raise ValueError("resume_text must be a string")
-    prompt = JSON_PROMPT_TMPL.format(resume=resume_text[:16000])
-    raw = _call_openai_chat(prompt, model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
-    cleaned = _clean_model_output(raw)
-    parsed = _extract_json(cleaned)
-    parsed = _ensure_keys(parsed)
-
-    normalized = {
-        "Candidate Name": (parsed.get("Candidate Name") or "").strip(),
-        "Email": normalize_email(parsed.get("Email")),
-        "Phone": normalize_phone(parsed.get("Phone")),
-        "Skills": normalize_skills(parsed.get("Skills")),
-        "Exp Years": to_int(parsed.get("Exp Years"), 0),
-        "Source": (parsed.get("Source") or "CV Upload").strip(),
-        "ResumeURL": (parsed.get("ResumeURL") or "").strip(),
-        "Salary": (parsed.get("Salary") or "").strip(),
-        "Notice Period": (parsed.get("Notice Period") or "").strip(),
-        "Current Location": (parsed.get("Current Location") or "").strip(),
-        "Status": (parsed.get("Status") or "New").strip(),
-        "Job Role": (parsed.get("Job Role") or "").strip(),
-    }
-    return normalized
+    return call_llm_resume_json_batch([resume_text])[0]
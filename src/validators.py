@@ -1,11 +1,16 @@
 # src/validators.py
 import re
 
+_EMAIL_RE = re.compile(r"[^@]+@[^@]+\.[^@]+")
+_PHONE_STRIP_RE = re.compile(r"[^\d+]")
+_SKILLS_SPLIT_RE = re.compile(r"[,;\n]")
+_DIGITS_RE = re.compile(r"\d+")
+
 def normalize_email(email: str) -> str:
     if not email or not isinstance(email, str):
         return ""
     email = email.strip().lower()
-    if re.match(r"[^@]+@[^@]+\.[^@]+", email):
+    if _EMAIL_RE.match(email):
         return email
     return ""
 
@@ -16,14 +21,14 @@ def normalize_phone(phone: str) -> str:
     if not phone or not isinstance(phone, str):
         return ""
     # Keep only digits and leading '+'
-    phone = re.sub(r"[^\d+]", "", phone)
+    phone = _PHONE_STRIP_RE.sub("", phone)
     return phone
 
 def normalize_skills(skills) -> str:
     if not skills:
         return ""
     if isinstance(skills, str):
-        skill_list = [s.strip().lower() for s in re.split(r",|;|\n", skills) if s.strip()]
+        skill_list = [s.strip().lower() for s in _SKILLS_SPLIT_RE.split(skills) if s.strip()]
         return ", ".join(skill_list)
     if isinstance(skills, (list, tuple)):
         skill_list = [str(s).strip().lower() for s in skills if s]
@@ -37,8 +42,16 @@ def to_int(value, default=0) -> int:
         return int(value)
     except (ValueError, TypeError):
         # extract digits
-        import re
-        m = re.search(r"\d+", str(value))
+        m = _DIGITS_RE.search(str(value))
         if m:
             return int(m.group())
     return default
+
+def normalize_records(rows: list) -> list:
+    """Return copies of parsed-resume dicts with Email, Phone and Skills normalized."""
+    rows = [dict(r) for r in rows]
+    for r in rows:
+        r["Email"] = normalize_email(r.get("Email"))
+        r["Phone"] = normalize_phone(r.get("Phone"))
+        r["Skills"] = normalize_skills(r.get("Skills"))
+    return rows
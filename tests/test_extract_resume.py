@@ -0,0 +1,72 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+from src import extract_resume
+from src.extract_resume import read_pdf_text, read_plain_text
+from src.llm_client import MAX_RESUME_CHARS
+
+
+class _Page:
+    def __init__(self, text, reads):
+        self.text, self.reads = text, reads
+
+    def extract_text(self):
+        self.reads.append(self.text)
+        return self.text
+
+
+def _fake_pypdf(texts, reads):
+    reader = types.SimpleNamespace(pages=[_Page(t, reads) for t in texts])
+    return types.SimpleNamespace(PdfReader=lambda fh, strict=False: reader)
+
+
+class ReadPdfTextTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def _read(self, texts):
+        reads = []
+        with mock.patch.dict(sys.modules, {"pypdf": _fake_pypdf(texts, reads)}):
+            return read_pdf_text(self.path), len(reads)
+
+    def test_keeps_reading_one_char_short_of_cap(self):
+        half = MAX_RESUME_CHARS // 2
+        pages = ["a" * half, "b" * (MAX_RESUME_CHARS - half - 2), "c", "d"]
+        text, reads = self._read(pages)
+        self.assertEqual(reads, 3)
+        self.assertEqual(len(text), MAX_RESUME_CHARS + 1)
+
+    def test_stops_once_cap_reached(self):
+        half = MAX_RESUME_CHARS // 2
+        pages = ["a" * half, "b" * (MAX_RESUME_CHARS - half - 1), "c"]
+        text, reads = self._read(pages)
+        self.assertEqual(reads, 2)
+        self.assertEqual(len(text), MAX_RESUME_CHARS)
+
+
+class ReadPlainTextTest(unittest.TestCase):
+    def _write(self, data: bytes) -> str:
+        fd, path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_universal_newlines(self):
+        path = self._write(b"Jane Doe\r\njane@x.co\rPython\n")
+        self.assertEqual(read_plain_text(path), "Jane Doe\njane@x.co\nPython\n")
+
+    def test_cap_does_not_split_multibyte_chars(self):
+        path = self._write("\u00e9".encode("utf-8") * 8)
+        with mock.patch.object(extract_resume, "MAX_TEXT_CHARS", 5):
+            self.assertEqual(read_plain_text(path), "\u00e9" * 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
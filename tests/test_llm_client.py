@@ -0,0 +1,124 @@
+import json
+import re
+import unittest
+from unittest import mock
+
+from src import llm_client
+
+
+def _reply(*names):
+    return json.dumps({"resumes": [{"Candidate Name": n} for n in names]})
+
+
+def _fake_chat(prompt, **kwargs):
+    # batched prompts get a reply that cannot be aligned; single ones echo their resume back
+    texts = [t.strip() for t in re.split(r"=== RESUME \d+ ===\n", prompt)[1:]]
+    if len(texts) > 1:
+        return "{\"resumes\": [{\"Candidate Name\": \"merged\""
+    if "BAD" in texts[0]:
+        return "not json"
+    return _reply(texts[0])
+
+
+class ParseBatchTest(unittest.TestCase):
+    def setUp(self):
+        for name, kw in (("_llm_cache_get", {"return_value": None}), ("_llm_cache_set", {})):
+            patcher = mock.patch.object(llm_client, name, **kw)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def test_aligned_reply(self):
+        with mock.patch.object(llm_client, "_call_openai_chat", return_value=_reply("A", "B")) as chat:
+            out = llm_client.call_llm_resume_json_batch(["a", "b"])
+        self.assertEqual([r["Candidate Name"] for r in out], ["A", "B"])
+        self.assertEqual(out[0]["Status"], "New")
+        self.assertEqual(chat.call_count, 1)
+
+    def test_count_mismatch_falls_back_per_text(self):
+        replies = [_reply("merged"), _reply("A"), _reply("B")]
+        with mock.patch.object(llm_client, "_call_openai_chat", side_effect=replies) as chat:
+            out = llm_client.call_llm_resume_json_batch(["a", "b"])
+        self.assertEqual([r["Candidate Name"] for r in out], ["A", "B"])
+        self.assertEqual(chat.call_count, 3)
+
+    def test_malformed_item_falls_back_per_text(self):
+        bad = json.dumps({"resumes": [{"Candidate Name": "A"}, "B"]})
+        replies = [bad, _reply("A"), _reply("B")]
+        with mock.patch.object(llm_client, "_call_openai_chat", side_effect=replies):
+            out = llm_client.call_llm_resume_json_batch(["a", "b"])
+        self.assertEqual([r["Candidate Name"] for r in out], ["A", "B"])
+
+    def test_one_bad_text_fails_alone(self):
+        texts = ["good one", "BAD text", "good two"]
+        with mock.patch.object(llm_client, "_call_openai_chat", side_effect=_fake_chat):
+            out = llm_client.call_llm_resume_json_batch(texts, return_errors=True)
+        self.assertEqual(out[0]["Candidate Name"], "good one")
+        self.assertIsInstance(out[1], ValueError)
+        self.assertEqual(out[2]["Candidate Name"], "good two")
+        self.assertEqual(self._llm_cache_set.call_count, 2)
+
+    def test_bad_text_raises_after_caching_the_rest(self):
+        with mock.patch.object(llm_client, "_call_openai_chat", side_effect=_fake_chat):
+            with self.assertRaises(ValueError):
+                llm_client.call_llm_resume_json_batch(["good one", "BAD text", "good two"])
+        self.assertEqual(self._llm_cache_set.call_count, 2)
+
+    def test_batch_size_capped_by_output_tokens(self):
+        texts = [f"t{i}" for i in range(20)]
+        sizes = []
+
+        def chat(prompt, max_tokens, **kwargs):
+            n = len(re.findall(r"=== RESUME \d+ ===\n", prompt))
+            sizes.append((n, max_tokens))
+            return _reply(*range(n))
+
+        with mock.patch.object(llm_client, "_call_openai_chat", side_effect=chat):
+            llm_client.call_llm_resume_json_batch(texts, batch_size=20)
+        self.assertEqual(sizes, [(16, 16000), (4, 4000)])
+
+    def test_single_text_mismatch_raises(self):
+        with mock.patch.object(llm_client, "_call_openai_chat", return_value=_reply()):
+            with self.assertRaises(ValueError):
+                llm_client.call_llm_resume_json("a")
+
+
+class CallOpenAIChatRetryTest(unittest.TestCase):
+    def test_missing_key_is_not_retried(self):
+        with mock.patch.object(llm_client, "_get_client", side_effect=RuntimeError("no key")) as get:
+            with self.assertRaises(RuntimeError):
+                llm_client._call_openai_chat("prompt")
+        self.assertEqual(get.call_count, 1)
+
+    def test_connection_error_is_retried(self):
+        import openai
+        err = openai.APIConnectionError(request=mock.Mock())
+        with mock.patch.object(llm_client, "_get_client", side_effect=err) as get, \
+                mock.patch.object(llm_client._call_openai_chat.retry, "sleep"):
+            with self.assertRaises(Exception):
+                llm_client._call_openai_chat("prompt")
+        self.assertEqual(get.call_count, 3)
+
+    def test_bad_request_is_not_retried(self):
+        import httpx
+        import openai
+        response = httpx.Response(400, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+        err = openai.BadRequestError("bad request", response=response, body=None)
+        with mock.patch.object(llm_client, "_get_client", side_effect=err) as get:
+            with self.assertRaises(openai.BadRequestError):
+                llm_client._call_openai_chat("prompt")
+        self.assertEqual(get.call_count, 1)
+
+    def test_rate_limit_is_retried(self):
+        import httpx
+        import openai
+        response = httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+        err = openai.RateLimitError("slow down", response=response, body=None)
+        with mock.patch.object(llm_client, "_get_client", side_effect=err) as get, \
+                mock.patch.object(llm_client._call_openai_chat.retry, "sleep"):
+            with self.assertRaises(Exception):
+                llm_client._call_openai_chat("prompt")
+        self.assertEqual(get.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
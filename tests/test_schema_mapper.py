@@ -0,0 +1,83 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+import schema_mapper as sm  # noqa: E402
+
+
+@unittest.skipIf(sm.linear_sum_assignment is None, "scipy not installed")
+class ResolveOptimalTest(unittest.TestCase):
+    def _resolve(self, candidates, sims):
+        keys, fields = list(candidates), ["X1", "Y1", "Z1"]
+        sm._resolve_optimal(candidates, keys, fields, sims, [[0.0] * 3 for _ in keys],
+                            sm._index_remote(tuple(fields)), accept_threshold=0.65)
+        return candidates
+
+    def test_uncontested_key_keeps_its_field(self):
+        # aa and bb contest X1; bb's runner-up Y1 belongs to kk, who could move to Z1
+        out = self._resolve({
+            "aa": {"field": "X1", "score": 0.9, "method": "fuzzy"},
+            "bb": {"field": "X1", "score": 0.8, "method": "fuzzy"},
+            "kk": {"field": "Y1", "score": 0.75, "method": "fuzzy"},
+        }, [[0.9, 0.1, 0.1], [0.8, 0.79, 0.1], [0.1, 0.75, 0.74]])
+        self.assertEqual(out["kk"], {"field": "Y1", "score": 0.75, "method": "fuzzy"})
+        self.assertEqual(out["aa"]["field"], "X1")
+        self.assertEqual(out["bb"]["method"], "conflict")
+
+    def test_contested_key_takes_free_field(self):
+        out = self._resolve({
+            "aa": {"field": "X1", "score": 0.9, "method": "fuzzy"},
+            "bb": {"field": "X1", "score": 0.8, "method": "fuzzy"},
+            "kk": {"field": "Y1", "score": 0.75, "method": "fuzzy"},
+        }, [[0.9, 0.1, 0.1], [0.8, 0.1, 0.7], [0.1, 0.75, 0.1]])
+        self.assertEqual(out["bb"], {"field": "Z1", "score": 0.7, "method": "fuzzy"})
+        self.assertEqual(out["aa"]["field"], "X1")
+        self.assertEqual(out["kk"]["field"], "Y1")
+
+    def test_weak_contest_keeps_top_claimant(self):
+        out = self._resolve({
+            "aa": {"field": "X1", "score": 0.5, "method": "fuzzy"},
+            "bb": {"field": "X1", "score": 0.4, "method": "fuzzy"},
+        }, [[0.5, 0.1, 0.1], [0.4, 0.1, 0.1]])
+        self.assertEqual(out["aa"], {"field": "X1", "score": 0.5, "method": "fuzzy"})
+        self.assertEqual(out["bb"]["method"], "conflict")
+
+
+    def test_weak_key_cannot_take_strong_keys_field(self):
+        ik = ["Skillset Amount Experience", "Email", "Year Location", "Link", "No", "Yrs Url Yrs",
+              "Amount Notice"]
+        rf = ["Email", "Experience Contact", "Mobile Yrs Ctc", "Url Expected", "City Notice Contact",
+              "Experience Year Name", "Experience", "Experience Notice", "Address Yrs Skill", "Job",
+              "Skill Pay"]
+        out = sm.auto_generate_mapping(ik, rf)
+        self.assertEqual(out["suggestions"]["Skillset Amount Experience"]["field"], "Experience")
+        self.assertNotEqual(out["suggestions"]["Link"]["field"], "Experience")
+        self.assertEqual(out["final_mapping"], {"Skillset Amount Experience": "Experience", "Email": "Email"})
+
+class LengthBoundPruningTest(unittest.TestCase):
+    IK = ["Skillset Amount Experience", "Email", "Year Location", "Link", "No", "Yrs Url Yrs",
+          "Amount Notice", "name", "full name", "exp_years", "current_ctc"]
+    RF = ["Email", "Experience Contact", "Mobile Yrs Ctc", "Url Expected", "City Notice Contact",
+          "Experience Year Name", "Experience", "Experience Notice", "Address Yrs Skill", "Job",
+          "Skill Pay", "Candidate Name", "Years of Experience", "Current Salary"]
+
+    def _run(self, prune: bool):
+        sm._auto_generate_mapping.cache_clear()
+        with mock.patch.object(sm, "rf_process", None), mock.patch.object(sm, "fuzz", None):
+            if prune:
+                return sm.auto_generate_mapping(self.IK, self.RF)
+            with mock.patch.object(sm, "_length_bound", lambda a, b: 1.0):
+                return sm.auto_generate_mapping(self.IK, self.RF)
+
+    def test_pruned_and_full_runs_agree(self):
+        self.addCleanup(sm._auto_generate_mapping.cache_clear)
+        pruned, full = self._run(True), self._run(False)
+        self.assertEqual(pruned["final_mapping"], full["final_mapping"])
+        self.assertEqual(pruned["suggestions"], full["suggestions"])
+        self.assertNotEqual(pruned["suggestions"]["No"]["field"], "City Notice Contact")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+from src.validators import normalize_records
+
+
+class NormalizeRecordsTest(unittest.TestCase):
+    def test_edge_cases(self):
+        rows = [
+            {"Email": " A@B.co ", "Phone": 5551234, "Skills": ["Py", "", "Go"]},
+            {"Email": "not-an-email", "Phone": None, "Skills": None},
+            {},
+        ]
+        self.assertEqual(normalize_records(rows), [
+            {"Email": "a@b.co", "Phone": "", "Skills": "py, go"},
+            {"Email": "", "Phone": "", "Skills": ""},
+            {"Email": "", "Phone": "", "Skills": ""},
+        ])
+
+    def test_string_columns(self):
+        out = normalize_records([{"Email": "bad", "Phone": "+1 (555) 123", "Skills": "SQL; Excel\nR"}])
+        self.assertEqual(out, [{"Email": "", "Phone": "+1555123", "Skills": "sql, excel, r"}])
+
+    def test_inputs_not_mutated(self):
+        row = {"Email": "X@Y.io", "Phone": None, "Skills": None}
+        normalize_records([row])
+        self.assertEqual(row["Email"], "X@Y.io")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,131 +4,358 @@ Auto-generate mapping from internal keys -> Airtable column names.
 
 Provides:
 - suggest_mapping(internal_keys, remote_fields) -> basic suggestions (no scores)
+- iter_suggest_mapping(internal_keys, remote_fields) -> the same, streamed as (key, field) pairs
 - auto_generate_mapping(internal_keys, remote_fields, thresholds...) -> detailed suggestions with confidence and a simple final mapping
 - helpers to load/save mapping files
 """
 import re
+import copy
 import json
+import math
+import string
+from functools import lru_cache
 from difflib import get_close_matches, SequenceMatcher
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, Iterator, Optional
 from pathlib import Path
 
+try:
+    import numpy as np
+except ImportError:  # optional: plain-Python matrix and summary stats
+    np = None
+
+try:
+    from rapidfuzz import fuzz, process as rf_process
+except ImportError:  # optional: fall back to difflib
+    fuzz = rf_process = None
+
+# orjson is optional: native-speed load/save of mapping files when installed
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = lambda o: orjson.dumps(o, option=orjson.OPT_INDENT_2)
+except ImportError:
+    _loads = json.loads
+    _dumps = lambda o: json.dumps(o, indent=2).encode("utf-8")
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # optional: fall back to greedy collision resolution
+    linear_sum_assignment = None
+
+_NORMALIZE_RE = re.compile(r"[\W_]+")
+# ASCII fast path: deletes every ASCII character except a-z and 0-9 (input is already lowercased)
+_ASCII_KEEP = set(string.ascii_lowercase + string.digits)
+_ASCII_TRANS = str.maketrans("", "", "".join(chr(c) for c in range(128) if chr(c) not in _ASCII_KEEP))
+
+@lru_cache(maxsize=4096)
 def _normalize(s: str) -> str:
     if s is None:
         return ""
     # lowercase, remove non-alphanumeric characters
     s = str(s).lower()
-    s = re.sub(r"[\W_]+", "", s)  # remove non-alphanumeric
+    if s.isascii():
+        return s.translate(_ASCII_TRANS)
+    s = _NORMALIZE_RE.sub("", s)  # remove non-alphanumeric
     return s.strip()
 
 def _similarity(a: str, b: str) -> float:
-    # use SequenceMatcher ratio on normalized strings
+    # ratio on normalized strings; rapidfuzz's C++ ratio when available, else SequenceMatcher
+    if a == b:
+        return 1.0
+    if fuzz is not None:
+        return fuzz.ratio(a, b) / 100.0
     return SequenceMatcher(None, a, b).ratio()
 
-def suggest_mapping(internal_keys: List[str], remote_fields: List[str]) -> Dict[str, str]:
+def _length_bound(a: str, b: str) -> float:
+    # upper bound of the ratio from the lengths alone: 2*min(la, lb) / (la + lb)
+    la, lb = len(a), len(b)
+    return 2 * min(la, lb) / (la + lb) if la + lb else 1.0
+
+def _similarity_matrix(norm_internal: List[str], norm_remote: List[str],
+                       floors: List[List[float]] = None) -> List[List[Optional[float]]]:
     """
-    Simple mapping suggestion (no scores) — retains earlier behavior.
+    Similarity of every (internal, remote) pair of normalized names as nested lists.
+    With rapidfuzz this is one multi-threaded cdist call instead of N*M Python-level calls.
+    On the difflib path, `floors[i][j]` is the similarity pair (i, j) needs to matter;
+    pairs whose length bound is below it are left as None without running SequenceMatcher.
+    """
+    if rf_process is not None and np is not None and norm_internal and norm_remote:
+        m = rf_process.cdist(norm_internal, norm_remote, scorer=fuzz.ratio, dtype=np.float64, workers=-1)
+        return (m / 100.0).tolist()
+    if floors is None:
+        return [[_similarity(a, b) for b in norm_remote] for a in norm_internal]
+    return [
+        [_similarity(a, b) if _length_bound(a, b) >= f else None for b, f in zip(norm_remote, row)]
+        for a, row in zip(norm_internal, floors)
+    ]
+
+def iter_suggest_mapping(internal_keys: List[str], remote_fields: List[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Streaming suggest_mapping: yields (internal_key, remote_field_or_empty) per key. The
+    lookup tables are built once, when iteration starts.
     """
     remote_norm = {rf: _normalize(rf) for rf in remote_fields}
     remote_by_norm = {v: k for k, v in remote_norm.items()}
+    choices = list(remote_norm.values())
 
-    mapping = {}
     for ik in internal_keys:
         ik_norm = _normalize(ik)
         # exact case-insensitive
         found = False
         for rf in remote_fields:
             if rf.lower() == ik.lower():
-                mapping[ik] = rf
+                yield ik, rf
                 found = True
                 break
         if found:
             continue
         # normalized exact
         if ik_norm in remote_by_norm:
-            mapping[ik] = remote_by_norm[ik_norm]
+            yield ik, remote_by_norm[ik_norm]
             continue
         # fuzzy
-        choices = list(remote_norm.values())
-        matches = get_close_matches(ik_norm, choices, n=1, cutoff=0.6)
+        if rf_process is not None:
+            best = rf_process.extractOne(ik_norm, choices, scorer=fuzz.ratio, score_cutoff=60)
+            matches = [best[0]] if best else []
+        else:
+            matches = get_close_matches(ik_norm, choices, n=1, cutoff=0.6)
         if matches:
             chosen_norm = matches[0]
-            mapping[ik] = remote_by_norm.get(chosen_norm, "")
+            yield ik, remote_by_norm.get(chosen_norm, "")
         else:
-            mapping[ik] = ""
-    return mapping
+            yield ik, ""
 
-def _keyword_score(internal: str, remote: str) -> float:
+def suggest_mapping(internal_keys: List[str], remote_fields: List[str]) -> Dict[str, str]:
     """
-    Boost score if keywords match (email, phone, skill, year, salary).
-    Returns a small bonus to add to fuzzy score.
+    Simple mapping suggestion (no scores) — retains earlier behavior.
     """
-    internal_l = internal.lower()
-    remote_l = remote.lower()
+    return dict(iter_suggest_mapping(internal_keys, remote_fields))
+
+_KW_LIST = [
+    ("email", 0.25),
+    ("phone", 0.25),
+    ("mobile", 0.25),
+    ("contact", 0.2),
+    ("skill", 0.2),
+    ("skillset", 0.2),
+    ("year", 0.2),
+    ("yrs", 0.18),
+    ("experience", 0.2),
+    ("salary", 0.2),
+    ("pay", 0.15),
+    ("amount", 0.12),
+]
+
+def _bonus_for_mask(mask: int) -> float:
     score = 0.0
-    kws = [
-        ("email", 0.25),
-        ("phone", 0.25),
-        ("mobile", 0.25),
-        ("contact", 0.2),
-        ("skill", 0.2),
-        ("skillset", 0.2),
-        ("year", 0.2),
-        ("yrs", 0.18),
-        ("experience", 0.2),
-        ("salary", 0.2),
-        ("pay", 0.15),
-        ("amount", 0.12),
-    ]
-    for kw, bonus in kws:
-        if kw in internal_l and kw in remote_l:
-            score += bonus
-        # also if remote contains token and internal contains similar semantically
-        if kw in remote_l and kw in internal_l:
+    for i, (_, bonus) in enumerate(_KW_LIST):
+        if mask >> i & 1:
             score += bonus
     return score
 
-def _find_best_candidate(internal: str, remote_fields: List[str]) -> Tuple[str, float, str]:
+# summed bonus for every possible set of shared keywords, indexed by bitmask
+_KW_BONUS_BY_MASK = [_bonus_for_mask(m) for m in range(1 << len(_KW_LIST))]
+_KW_BONUS_ARRAY = np.array(_KW_BONUS_BY_MASK) if np is not None else None
+
+_KW_BITS = tuple((kw, 1 << i) for i, (kw, _) in enumerate(_KW_LIST))
+
+@lru_cache(maxsize=4096)
+def _kw_mask(s_lower: str) -> int:
+    """
+    The set of _KW_LIST keywords occurring in the (lowercased) string, as a bitmask
+    (bit i <=> keyword i), so set intersection is a single `&`.
+    """
+    return sum(bit for kw, bit in _KW_BITS if kw in s_lower)
+
+def _keyword_score(internal: str, remote: str) -> float:
+    """
+    Boost score if keywords match (email, phone, skill, year, salary).
+    Returns a small bonus to add to fuzzy score: the table entry for the
+    intersection of the two strings' keyword sets.
+    """
+    return _KW_BONUS_BY_MASK[_kw_mask(internal.lower()) & _kw_mask(remote.lower())]
+
+def _bonus_matrix(internal_keys: List[str], remote_lower: List[str]) -> List[List[float]]:
+    """
+    _keyword_score for every (internal, remote) pair. With numpy it is one outer AND of the
+    keyword masks and one gather from the bonus table.
+    """
+    mi = [_kw_mask(ik.lower()) for ik in internal_keys]
+    mr = [_kw_mask(rl) for rl in remote_lower]
+    if np is not None and mi and mr:
+        return _KW_BONUS_ARRAY[np.bitwise_and.outer(np.array(mi), np.array(mr))].tolist()
+    return [[_KW_BONUS_BY_MASK[a & b] for b in mr] for a in mi]
+
+@lru_cache(maxsize=64)
+def _index_remote(remote_fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """
+    Per-schema lookup tables for _find_best_candidate: the normalized and lowercased names
+    (in field order) and the case-insensitive / normalized exact-match dicts (first field wins).
+    Cached per schema, so callers must treat the result as read-only.
+    """
+    norm = [_normalize(rf) for rf in remote_fields]
+    lower = [rf.lower() for rf in remote_fields]
+    lower_to_rf: Dict[str, str] = {}
+    norm_to_rf: Dict[str, str] = {}
+    for rf, rl, rn in zip(remote_fields, lower, norm):
+        lower_to_rf.setdefault(rl, rf)
+        if rn:
+            norm_to_rf.setdefault(rn, rf)
+    return {"norm": norm, "lower": lower, "lower_to_rf": lower_to_rf, "norm_to_rf": norm_to_rf}
+
+def _find_best_candidate(internal: str, remote_fields: List[str],
+                         sims: List[Optional[float]] = None,
+                         index: Dict[str, Any] = None,
+                         auto_apply_threshold: float = None,
+                         bonuses: List[float] = None) -> Tuple[str, float, str]:
     """
     Return (best_field_or_empty, score, method)
     method in {"exact","normalized","keyword","fuzzy"}
+    `sims` / `bonuses` are this key's rows of _similarity_matrix / _bonus_matrix and `index`
+    the _index_remote tables; all are computed here when not given. With
+    `auto_apply_threshold` the fuzzy pass stops at the first field reaching it. A pruned (None)
+    similarity is only computed when its length bound could still beat the best field so far,
+    so the result is the same as with the full matrix.
     """
     ik_norm = _normalize(internal)
+    if index is None:
+        index = _index_remote(tuple(remote_fields))
+    if sims is None:
+        sims = _similarity_matrix([ik_norm], index["norm"])[0]
+    if bonuses is None:
+        bonuses = _bonus_matrix([internal], index["lower"])[0]
+    internal_l = internal.lower()
     # exact (case-insensitive)
-    for rf in remote_fields:
-        if rf.lower() == internal.lower():
-            return rf, 1.0, "exact"
+    rf = index["lower_to_rf"].get(internal_l)
+    if rf is not None:
+        return rf, 1.0, "exact"
 
     # normalized exact
-    remote_norm_map = {rf: _normalize(rf) for rf in remote_fields}
-    for rf, rn in remote_norm_map.items():
-        if rn == ik_norm and rn != "":
-            return rf, 0.98, "normalized"
+    rf = index["norm_to_rf"].get(ik_norm)
+    if rf is not None:
+        return rf, 0.98, "normalized"
 
     # keyword heuristic
-    keyword_matches = []
-    for rf in remote_fields:
-        if any(tok in rf.lower() for tok in internal.lower().split()):
-            # give a base score from similarity and add keyword bonus
-            sim = _similarity(ik_norm, _normalize(rf))
-            bonus = _keyword_score(internal, rf)
-            keyword_matches.append((rf, min(1.0, sim + bonus), "keyword"))
-    if keyword_matches:
-        keyword_matches.sort(key=lambda t: t[1], reverse=True)
-        return keyword_matches[0]
+    # distinct tokens of the key, in order; each is a substring test on the lowercased field
+    tokens = list(dict.fromkeys(internal_l.split()))
+    best = None
+    for rf, rl, rn, sim, bonus in zip(remote_fields, index["lower"], index["norm"], sims, bonuses):
+        if any(tok in rl for tok in tokens):
+            if sim is None:
+                if best is not None and min(1.0, _length_bound(ik_norm, rn) + bonus) <= best[1]:
+                    continue
+                sim = _similarity(ik_norm, rn)
+            # give a base score from similarity and add keyword bonus; earliest field wins ties
+            score = min(1.0, sim + bonus)
+            if best is None or score > best[1]:
+                best = (rf, score, "keyword")
+    if best is not None:
+        return best
 
     # fuzzy
     best = ("", 0.0, "")
-    for rf in remote_fields:
-        sim = _similarity(ik_norm, _normalize(rf))
+    for rf, rn, sim, bonus in zip(remote_fields, index["norm"], sims, bonuses):
+        if sim is None:
+            if _length_bound(ik_norm, rn) + bonus <= best[1]:
+                continue
+            sim = _similarity(ik_norm, rn)
         # add small keyword boost
-        sim = sim + _keyword_score(internal, rf)
+        sim = sim + bonus
         if sim > best[1]:
             best = (rf, sim, "fuzzy")
+            if auto_apply_threshold is not None and sim >= auto_apply_threshold:
+                break
     if best[1] > 0:
         return best
     return "", 0.0, ""
 
+def _score_row(internal: str, remote_fields: List[str], sims: List[Optional[float]], bonuses: List[float],
+               index: Dict[str, Any]) -> List[Optional[Tuple[float, str]]]:
+    """
+    (score, method) of `internal` against every remote field, rated as _find_best_candidate
+    would; None for pairs _similarity_matrix pruned, which cannot reach accept_threshold.
+    """
+    internal_l = internal.lower()
+    ik_norm = _normalize(internal)
+    tokens = list(dict.fromkeys(internal_l.split()))
+    row = []
+    for rl, rn, sim, bonus in zip(index["lower"], index["norm"], sims, bonuses):
+        if rl == internal_l:
+            row.append((1.0, "exact"))
+        elif rn and rn == ik_norm:
+            row.append((0.98, "normalized"))
+        elif sim is None:
+            row.append(None)
+        elif any(tok in rl for tok in tokens):
+            row.append((min(1.0, sim + bonus), "keyword"))
+        else:
+            row.append((sim + bonus, "fuzzy"))
+    return row
+
+def _resolve_greedy(candidates: Dict[str, Dict[str, Any]]) -> None:
+    """Keep the highest-scoring key for each contested field (earliest on ties) and unset the others."""
+    winner: Dict[str, Tuple[str, float]] = {}
+    for ik, info in candidates.items():
+        fld = info["field"]
+        if not fld:
+            continue
+        prev = winner.setdefault(fld, (ik, info["score"]))
+        if prev[0] == ik:
+            continue
+        # demote whichever of the two scores lower
+        if info["score"] > prev[1]:
+            winner[fld] = (ik, info["score"])
+            loser = prev[0]
+        else:
+            loser = ik
+        candidates[loser].update(field="", score=0.0, method="conflict")
+
+def _resolve_optimal(candidates: Dict[str, Dict[str, Any]], internal_keys: List[str],
+                     remote_fields: List[str], sim_matrix: List[List[float]],
+                     bonus_matrix: List[List[float]], index: Dict[str, Any],
+                     accept_threshold: float) -> None:
+    """
+    Re-assign the keys that share a field one-to-one, maximizing their total score (Hungarian
+    algorithm) over the contested fields and the ones no key took. Uncontested keys keep their
+    field. Only pairs scoring at least `accept_threshold` count toward the total, so a weak key
+    can never take a strong key's field. A contested field left unassigned goes back to its
+    highest-scoring claimant (as in _resolve_greedy); other keys without a field become "conflict".
+    """
+    holders: Dict[str, List[str]] = {}
+    for ik, info in candidates.items():
+        if info["field"]:
+            holders.setdefault(info["field"], []).append(ik)
+    keys = [ik for ik, info in candidates.items() if len(holders.get(info["field"], ())) > 1]
+    kept = {fld for fld, iks in holders.items() if len(iks) == 1}
+    cols = [j for j, rf in enumerate(remote_fields) if rf not in kept]
+
+    rows_by_key = dict(zip(internal_keys, zip(sim_matrix, bonus_matrix)))
+    cells = []
+    for ik in keys:
+        own = candidates[ik]
+        row = _score_row(ik, remote_fields, *rows_by_key[ik], index)
+        cells.append([(own["score"], own["method"]) if remote_fields[j] == own["field"] else row[j]
+                      for j in cols])
+    gain = [[cell[0] if cell and cell[0] >= accept_threshold else 0.0 for cell in row] for row in cells]
+    r_idx, c_idx = linear_sum_assignment([[-g for g in row] for row in gain])
+    assigned = dict(zip(r_idx.tolist(), c_idx.tolist()))
+    taken = set()
+    unplaced = []
+    for i, ik in enumerate(keys):
+        c = assigned.get(i)
+        if c is None or gain[i][c] <= 0:
+            unplaced.append(ik)
+            continue
+        score, method = cells[i][c]
+        taken.add(remote_fields[cols[c]])
+        candidates[ik] = {"field": remote_fields[cols[c]], "score": round(float(score), 3), "method": method}
+    # stable sort: earliest key wins ties, like _resolve_greedy
+    for ik in sorted(unplaced, key=lambda k: -candidates[k]["score"]):
+        if candidates[ik]["field"] in taken:
+            candidates[ik] = {"field": "", "score": 0.0, "method": "conflict"}
+        else:
+            taken.add(candidates[ik]["field"])
+
 def auto_generate_mapping(
     internal_keys: List[str],
     remote_fields: List[str],
@@ -148,57 +375,88 @@ def auto_generate_mapping(
       "summary": {"min_score": 0.90, "avg_score": 0.93, "all_mapped": True/False}
     }
     """
-    # build candidate list
+    result = _auto_generate_mapping(tuple(internal_keys), tuple(remote_fields),
+                                    auto_apply_threshold, accept_threshold)
+    # the cached result is shared between calls, so hand out a copy
+    return copy.deepcopy(result)
+
+@lru_cache(maxsize=64)
+def _auto_generate_mapping(
+    internal_keys: Tuple[str, ...],
+    remote_fields: Tuple[str, ...],
+    auto_apply_threshold: float,
+    accept_threshold: float,
+) -> Dict[str, Any]:
+    index = _index_remote(remote_fields)
+
+    # fast path: every key has its own case-insensitive exact match (e.g. identical schemas)
+    lower_to_rf = index["lower_to_rf"]
+    exact = {ik: lower_to_rf.get(ik.lower()) for ik in internal_keys}
+    if None not in exact.values() and len(set(exact.values())) == len(exact):
+        candidates = {ik: {"field": rf, "score": 1.0, "method": "exact"} for ik, rf in exact.items()}
+        final_mapping = dict(exact) if 1.0 >= accept_threshold else {}
+        return {"suggestions": candidates, "final_mapping": final_mapping,
+                "summary": _summarize(candidates, accept_threshold)}
+
+    # build candidate list; all pairwise similarities are scored in one batch up front
+    bonus_matrix = _bonus_matrix(internal_keys, index["lower"])
+    floors = None
+    if rf_process is None:
+        # pairs that stay under accept_threshold even with their keyword bonus are pruned;
+        # _find_best_candidate still scores one if it could be a key's best field
+        floors = [[accept_threshold - b for b in row] for row in bonus_matrix]
+    sim_matrix = _similarity_matrix([_normalize(ik) for ik in internal_keys], index["norm"], floors)
     candidates = {}
-    for ik in internal_keys:
-        field, score, method = _find_best_candidate(ik, remote_fields)
+    for ik, sims, bonuses in zip(internal_keys, sim_matrix, bonus_matrix):
+        field, score, method = _find_best_candidate(ik, remote_fields, sims, index,
+                                                    auto_apply_threshold, bonuses)
         candidates[ik] = {"field": field or "", "score": round(float(score), 3), "method": method}
 
-    # Resolve collisions: ensure one remote field maps to only one internal key. If collisions occur,
-    # keep the mapping with higher score and unset others.
-    field_to_iks: Dict[str, List[Tuple[str, float]]] = {}
-    for ik, info in candidates.items():
-        fld = info["field"]
-        if not fld:
-            continue
-        field_to_iks.setdefault(fld, []).append((ik, info["score"]))
-
-    # For each field with multiple iks, keep highest score
-    for fld, iks in field_to_iks.items():
-        if len(iks) <= 1:
-            continue
-        # sort by score desc
-        iks_sorted = sorted(iks, key=lambda t: t[1], reverse=True)
-        # keep the first, unset rest
-        keep_ik = iks_sorted[0][0]
-        for ik, _ in iks_sorted[1:]:
-            candidates[ik]["field"] = ""
-            candidates[ik]["score"] = 0.0
-            candidates[ik]["method"] = "conflict"
+    # Resolve collisions: ensure one remote field maps to only one internal key. With SciPy the
+    # contested keys are re-assigned optimally over the fields still free; otherwise keep the
+    # mapping with higher score and unset others.
+    taken = [info["field"] for info in candidates.values() if info["field"]]
+    if len(taken) != len(set(taken)):
+        if linear_sum_assignment is not None:
+            _resolve_optimal(candidates, internal_keys, remote_fields, sim_matrix, bonus_matrix,
+                             index, accept_threshold)
+        else:
+            _resolve_greedy(candidates)
 
     # Build final_mapping only including suggestions that meet accept_threshold
-    final_mapping = {}
-    scores = []
-    for ik, info in candidates.items():
-        scores.append(info["score"])
-        if info["field"] and info["score"] >= accept_threshold:
-            final_mapping[ik] = info["field"]
-
-    summary = {
-        "min_score": min(scores) if scores else 0.0,
-        "avg_score": round(sum(scores) / len(scores), 3) if scores else 0.0,
-        "all_mapped": all((candidates[ik]["field"] and candidates[ik]["score"] >= accept_threshold) for ik in internal_keys)
-    }
+    final_mapping = {ik: info["field"] for ik, info in candidates.items()
+                     if info["field"] and info["score"] >= accept_threshold}
 
-    return {"suggestions": candidates, "final_mapping": final_mapping, "summary": summary}
+    return {"suggestions": candidates, "final_mapping": final_mapping,
+            "summary": _summarize(candidates, accept_threshold)}
+
+def _summarize(candidates: Dict[str, Dict[str, Any]], accept_threshold: float) -> Dict[str, Any]:
+    if not candidates:
+        return {"min_score": 0.0, "avg_score": 0.0, "all_mapped": True}
+    infos = list(candidates.values())
+    if np is not None:
+        scores = np.fromiter((info["score"] for info in infos), dtype=np.float64, count=len(infos))
+        mapped = np.fromiter((bool(info["field"]) for info in infos), dtype=bool, count=len(infos))
+        return {
+            "min_score": float(scores.min()),
+            # fsum (exactly rounded) rather than the pairwise-summed mean, so both paths agree
+            "avg_score": round(math.fsum(scores.tolist()) / len(infos), 3),
+            "all_mapped": bool((mapped & (scores >= accept_threshold)).all()),
+        }
+    scores = [info["score"] for info in infos]
+    return {
+        "min_score": min(scores),
+        "avg_score": round(math.fsum(scores) / len(scores), 3),
+        "all_mapped": all(info["field"] and info["score"] >= accept_threshold for info in infos),
+    }
 
 def load_mapping_file(path: str) -> Dict[str, str]:
     p = Path(path)
     if not p.exists():
         raise FileNotFoundError(f"Mapping file not found: {path}")
-    return json.loads(p.read_text(encoding="utf-8"))
+    return _loads(p.read_bytes())
 
 def save_mapping_file(mapping: Dict[str, str], path: str) -> None:
     p = Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(json.dumps(mapping, indent=2), encoding="utf-8")
+    p.write_bytes(_dumps(mapping))